@@ -1,42 +1,204 @@
 
 import os
+import re
 import asyncio
-from typing import Optional, Dict, Any
-from contextlib import asynccontextmanager
+from typing import Optional, Dict, Any, List, Tuple, AsyncIterator
+from collections import Counter, OrderedDict, deque
+from contextlib import asynccontextmanager, suppress
 
 import httpx
+import orjson
 from fastapi import FastAPI, HTTPException, Depends
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import Response, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 from dotenv import load_dotenv
 from loguru import logger
 import yaml
 
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
+
 
 load_dotenv()
 
 
 logger.remove()
 logger.add(
-    "logs/app.log",
+    os.getenv("LOG_FILE", "logs/app.log"),
     rotation="1 day",
     retention="7 days",
     level=os.getenv("LOG_LEVEL", "INFO"),
     format="{time:YYYY-MM-DD HH:mm:ss} | {level} | {message}"
 )
-logger.add(
-    lambda msg: print(msg, end=""),
-    level=os.getenv("LOG_LEVEL", "INFO"),
-    format="<green>{time:HH:mm:ss}</green> | <level>{level}</level> | {message}"
-)
+# Console output duplicates every file write; disable it in production
+if os.getenv("LOG_TO_STDOUT", "True").lower() == "true":
+    logger.add(
+        lambda msg: print(msg, end=""),
+        level=os.getenv("LOG_LEVEL", "INFO"),
+        format="<green>{time:HH:mm:ss}</green> | <level>{level}</level> | {message}"
+    )
+
+# Guardrail settings, read once at import rather than on every request
+MAX_INPUT_LENGTH = int(os.getenv("MAX_INPUT_LENGTH", "1500"))
+MAX_RESPONSE_LENGTH = int(os.getenv("MAX_RESPONSE_LENGTH", "1000"))
+ENABLE_TOPIC_RESTRICTIONS = os.getenv("ENABLE_TOPIC_RESTRICTIONS", "True").lower() == "true"
+ENABLE_TOXICITY_FILTER = os.getenv("ENABLE_TOXICITY_FILTER", "True").lower() == "true"
+ENABLE_CITATION_ENFORCEMENT = os.getenv("ENABLE_CITATION_ENFORCEMENT", "True").lower() == "true"
+INPUT_CHECK_CACHE_SIZE = int(os.getenv("INPUT_CHECK_CACHE_SIZE", "10000"))
+
+# Comma-separated list of origins allowed to call the API from a browser
+CORS_ORIGINS = [origin.strip() for origin in os.getenv("CORS_ORIGINS", "").split(",") if origin.strip()]
+
+# Start generation alongside the input check instead of after it. Saves the
+# guardrail latency on allowed requests but spends tokens on blocked ones.
+GUARDRAIL_PARALLEL = os.getenv("GUARDRAIL_PARALLEL", "False").lower() == "true"
+
+def fold_case(text: str) -> str:
+    """Lowercase text for guardrail pattern matching.
+    
+    str.lower already has a fast path for ASCII text. Other text is lowered as
+    UTF-8 bytes, skipping the Unicode case tables and folding only ASCII
+    letters, the only letters guardrail patterns contain.
+    """
+    if text.isascii():
+        return text.lower()
+    return text.encode("utf-8", "surrogatepass").lower().decode("utf-8", "surrogatepass")
+
+
+def _walk_dfa(buf, goto, terminal):
+    """Walk a DFA over buf, returning (end offset, state) wherever a pattern ends."""
+    hits = []
+    state = 0
+    for i in range(len(buf)):
+        state = goto[state][buf[i]]
+        if terminal[state]:
+            hits.append((i, state))
+    return hits
+
+
+# NumPy and the Numba-compiled _walk_dfa, loaded by _load_jit only when
+# ByteAutomaton is needed so normal startup does not pay for importing them
+np = None
+_scan_states = None
+
+
+def _load_jit() -> bool:
+    """Import NumPy and compile the DFA walk with Numba, returning False if either is missing."""
+    global np, _scan_states
+    if _scan_states is None:
+        try:
+            import numpy
+            from numba import njit
+        except ImportError:
+            return False
+        np = numpy
+        _scan_states = njit(cache=True)(_walk_dfa)
+    return True
+
+
+class ByteAutomaton:
+    """Aho-Corasick automaton compiled to a byte-level DFA transition table.
+    
+    Fallback for deployments without pyahocorasick, implementing the part of
+    its Automaton API used here. Patterns and text are matched as UTF-8 bytes,
+    so end offsets from iter() are byte offsets. Requires Numba and NumPy
+    (the jit extra), which compile the scan loop.
+    """
+    
+    def __init__(self):
+        self.words: Dict[bytes, Any] = {}
+        self.goto = None
+        self.terminal = None
+        self.outputs: List[List[Any]] = []
+    
+    def add_word(self, key: str, value: Any) -> None:
+        self.words[key.encode("utf-8")] = value
+    
+    def make_automaton(self) -> None:
+        # Build the keyword trie; 0 marks a missing edge (nothing points back to the root)
+        goto = [[0] * 256]
+        outputs: List[List[Any]] = [[]]
+        for word, value in self.words.items():
+            state = 0
+            for byte in word:
+                if not goto[state][byte]:
+                    goto.append([0] * 256)
+                    outputs.append([])
+                    goto[state][byte] = len(goto) - 1
+                state = goto[state][byte]
+            outputs[state].append(value)
+        
+        # Fill in failure transitions breadth-first so every state has a full row
+        fail = [0] * len(goto)
+        queue = deque(child for child in goto[0] if child)
+        while queue:
+            state = queue.popleft()
+            outputs[state] = outputs[state] + outputs[fail[state]]
+            for byte in range(256):
+                child = goto[state][byte]
+                if child:
+                    fail[child] = goto[fail[state]][byte]
+                    queue.append(child)
+                else:
+                    goto[state][byte] = goto[fail[state]][byte]
+        
+        self.outputs = outputs
+        self.goto = np.array(goto, dtype=np.int32)
+        self.terminal = np.array([bool(values) for values in outputs], dtype=np.bool_)
+    
+    def iter(self, text: str):
+        buf = np.frombuffer(text.encode("utf-8", "surrogatepass"), dtype=np.uint8)
+        for end, state in _scan_states(buf, self.goto, self.terminal):
+            for value in self.outputs[state]:
+                yield end, value
+
+
+class BytePatternSet:
+    """Multi-pattern matcher running one C-level bytes.find per pattern.
+    
+    Lower-lift fallback for deployments with neither pyahocorasick nor Numba,
+    implementing the same add_word/make_automaton/iter API. Only the first
+    occurrence of each pattern is reported, which is all the guardrails need.
+    """
+    
+    def __init__(self):
+        self.words: Dict[bytes, Any] = {}
+    
+    def add_word(self, key: str, value: Any) -> None:
+        self.words[key.encode("utf-8")] = value
+    
+    def make_automaton(self) -> None:
+        self.patterns = list(self.words.items())
+    
+    def iter(self, text: str):
+        buf = text.encode("utf-8", "surrogatepass")
+        for pattern, value in self.patterns:
+            position = buf.find(pattern)
+            if position >= 0:
+                yield position + len(pattern) - 1, value
+
 
 # Global variables for guardrails
 guardrails_app = None
 chatgroq_client = None
 
 
+class OrjsonResponse(Response):
+    """JSON response encoded with orjson, for endpoints without a response model."""
+    media_type = "application/json"
+    
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content)
+
+
 class ChatRequest(BaseModel):
     """Request model for chat endpoint."""
+    model_config = ConfigDict(str_max_length=2000, extra="forbid")
+    
     message: str = Field(..., min_length=1, max_length=2000, description="User message")
     user_id: Optional[str] = Field(None, description="Optional user identifier")
     conversation_id: Optional[str] = Field(None, description="Optional conversation identifier")
@@ -84,6 +246,92 @@ class GuardrailsManager:
             "studies prove", "research indicates", "data reveals", "findings show"
         ]
         
+        self.citation_markers = [
+            "source:", "reference:", "citation:", "study:", "research:",
+            "according to", "as cited in", "from the study", "per the research"
+        ]
+        
+        self.hallucination_indicators = [
+            "i don't know", "i'm not sure", "i can't", "i cannot",
+            "i'm not able to", "i don't have access to"
+        ]
+        
+        # Common phrases in which a toxic keyword is not meant as toxic
+        self.keyword_exceptions = {
+            "hell": ["how are you", "what the", "go to"],
+            "damn": ["damn good", "damn right"]
+        }
+        
+        # Profanity is toxic anywhere in a word ("motherfucker"). Milder
+        # keywords must start or end a word, which catches inflections
+        # ("idiots") but not words that merely contain one ("studied")
+        self.profanity_keywords = frozenset(["fuck", "shit", "bitch", "asshole"])
+        keywords = "|".join(re.escape(keyword) for keyword in self.toxic_keywords if keyword not in self.profanity_keywords)
+        self._toxic_keyword_pattern = re.compile(rf"\b(?:{keywords})|(?:{keywords})\b")
+        
+        # Compile the pattern lists into one automaton so each check is a
+        # single pass over the text instead of one substring search per pattern.
+        # Toxic keywords found by it are then confirmed against word boundaries.
+        self.automaton = self._build_automaton({
+            "topic_restriction": self.topic_restrictions,
+            "toxic_keyword": self.toxic_keywords,
+            "toxic_phrase": self.toxic_phrases,
+            "citation_indicator": self.citation_indicators,
+            "citation_marker": self.citation_markers,
+            "hallucination_indicator": self.hallucination_indicators,
+        })
+        # Input checks depend only on the message text, so repeated messages
+        # are answered from an LRU cache. It is only touched on the event loop,
+        # so hits skip the threadpool and need no lock.
+        self._input_cache: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._input_cache_hits = 0
+        self._input_cache_misses = 0
+        # Exception phrases tagged with the keyword they excuse
+        self._allow_automaton = self._build_automaton(self.keyword_exceptions)
+        # Overlap needed between windows when scanning streamed output
+        self.max_pattern_length = max(
+            len(pattern) for pattern in
+            self.topic_restrictions + self.toxic_keywords + self.toxic_phrases + self.citation_indicators
+            + self.citation_markers + self.hallucination_indicators
+        )
+        
+    @staticmethod
+    def _build_automaton(pattern_lists: Dict[str, List[str]]) -> Any:
+        """Build an Aho-Corasick automaton tagging each pattern with (category, rank)."""
+        tags: Dict[str, List[Tuple[str, int]]] = {}
+        for category, patterns in pattern_lists.items():
+            for rank, pattern in enumerate(patterns):
+                # The same pattern may live in several lists (e.g. "hate")
+                tags.setdefault(pattern, []).append((category, rank))
+        
+        if ahocorasick:
+            automaton = ahocorasick.Automaton()
+        elif _load_jit():
+            automaton = ByteAutomaton()
+        else:
+            automaton = BytePatternSet()
+        for pattern, pattern_tags in tags.items():
+            automaton.add_word(pattern, (pattern, tuple(pattern_tags)))
+        automaton.make_automaton()
+        return automaton
+    
+    def _scan(self, text: str, automaton: Optional[Any] = None) -> Dict[str, List[Tuple[int, str]]]:
+        """Scan text once and group matched patterns by category as (rank, pattern)."""
+        matches: Dict[str, List[Tuple[int, str]]] = {}
+        for _, (pattern, pattern_tags) in (automaton or self.automaton).iter(text):
+            for category, rank in pattern_tags:
+                matches.setdefault(category, []).append((rank, pattern))
+        return matches
+    
+    def _toxic_keyword_hits(self, text: str, matches: Dict[str, List[Tuple[int, str]]]) -> List[str]:
+        """Return toxic keywords in text, in list order, from the automaton's candidates."""
+        candidates = {pattern for _, pattern in matches.get("toxic_keyword", ())}
+        hits = candidates & self.profanity_keywords
+        if len(hits) < len(candidates):
+            # Only texts containing a milder keyword pay for the boundary regex
+            hits.update(self._toxic_keyword_pattern.findall(text))
+        return sorted(hits, key=self.toxic_keywords.index)
+        
     async def initialize(self):
         """Initialize the guardrails application."""
         try:
@@ -114,169 +362,271 @@ class GuardrailsManager:
             return False
     
     async def check_input(self, message: str, user_id: Optional[str] = None) -> Dict[str, Any]:
-        """Comprehensive input guardrails checking."""
+        """Comprehensive input guardrails checking, run off the event loop on a cache miss."""
+        cached = self._input_cache.get(message)
+        if cached is not None:
+            self._input_cache.move_to_end(message)
+            self._input_cache_hits += 1
+            return dict(cached)
+        
+        self._input_cache_misses += 1
         try:
-            message_lower = message.lower()
-            
-            # 1. Topic Restrictions - Block discussions on sensitive topics
-            for topic in self.topic_restrictions:
-                if topic in message_lower:
-                    return {
-                        "blocked": True,
-                        "reason": f"Topic restriction: '{topic}' detected",
-                        "category": "topic_restriction",
-                        "severity": "high"
-                    }
-            
-            # 2. Toxicity Filter - Prevent harmful or offensive language
-            # Check for toxic phrases first (more specific)
-            for phrase in self.toxic_phrases:
-                if phrase in message_lower:
-                    return {
-                        "blocked": True,
-                        "reason": f"Toxicity detected: '{phrase}' found",
-                        "category": "toxicity",
-                        "severity": "high"
-                    }
-            
-            # Check for toxic keywords (but be more careful about context)
-            for keyword in self.toxic_keywords:
-                if keyword in message_lower:
-                    # Skip if it's part of a common phrase that's not toxic
-                    if keyword == "hell" and any(phrase in message_lower for phrase in ["how are you", "what the", "go to"]):
-                        continue
-                    if keyword == "damn" and any(phrase in message_lower for phrase in ["damn good", "damn right"]):
-                        continue
-                    
-                    return {
-                        "blocked": True,
-                        "reason": f"Toxicity detected: '{keyword}' found",
-                        "category": "toxicity",
-                        "severity": "high"
-                    }
-            
-            # 3. Response Length Control - Limit input to reasonable size
-            max_length = int(os.getenv("MAX_INPUT_LENGTH", "1500"))
-            if len(message) > max_length:
-                return {
-                    "blocked": True,
-                    "reason": f"Input too long (max {max_length} characters)",
-                    "category": "length",
-                    "severity": "medium"
-                }
+            result = await run_in_threadpool(self._check_input_sync, message)
+        except Exception as e:
+            # Not cached, so a transient failure does not stick to the message
+            logger.error("Error checking input guardrails: {}", e)
+            return {"blocked": False, "reason": None}
+        
+        if INPUT_CHECK_CACHE_SIZE > 0:
+            self._input_cache[message] = result
+            if len(self._input_cache) > INPUT_CHECK_CACHE_SIZE:
+                self._input_cache.popitem(last=False)
+        return dict(result)
+    
+    def input_cache_info(self) -> Dict[str, Any]:
+        """Hit/miss statistics of the input check cache."""
+        return {
+            "hits": self._input_cache_hits,
+            "misses": self._input_cache_misses,
+            "maxsize": INPUT_CHECK_CACHE_SIZE,
+            "currsize": len(self._input_cache)
+        }
+    
+    def _check_input_sync(self, message: str) -> Dict[str, Any]:
+        """Run the CPU-bound input checks synchronously. Errors propagate to check_input."""
+        message_lower = fold_case(message)
+        
+        matches = self._scan(message_lower)
+        
+        # 1. Topic Restrictions - Block discussions on sensitive topics
+        if "topic_restriction" in matches:
+            topic = min(matches["topic_restriction"])[1]
+            return {
+                "blocked": True,
+                "reason": f"Topic restriction: '{topic}' detected",
+                "category": "topic_restriction",
+                "severity": "high"
+            }
+        
+        # 2. Toxicity Filter - Prevent harmful or offensive language
+        # Check for toxic phrases first (more specific)
+        if "toxic_phrase" in matches:
+            phrase = min(matches["toxic_phrase"])[1]
+            return {
+                "blocked": True,
+                "reason": f"Toxicity detected: '{phrase}' found",
+                "category": "toxicity",
+                "severity": "high"
+            }
+        
+        # Check for toxic keywords (but be more careful about context)
+        toxic_hits = self._toxic_keyword_hits(message_lower, matches)
+        allowed_contexts = self._scan(message_lower, self._allow_automaton) if toxic_hits else {}
+        for keyword in toxic_hits:
+            # Skip if it's part of a common phrase that's not toxic
+            if keyword in allowed_contexts:
+                continue
             
-            # 4. Additional safety checks
-            # Check for potential spam patterns
-            if message.count(' ') < 2 and len(message) > 50:
+            return {
+                "blocked": True,
+                "reason": f"Toxicity detected: '{keyword}' found",
+                "category": "toxicity",
+                "severity": "high"
+            }
+        
+        # 3. Response Length Control - Limit input to reasonable size
+        if len(message) > MAX_INPUT_LENGTH:
+            return {
+                "blocked": True,
+                "reason": f"Input too long (max {MAX_INPUT_LENGTH} characters)",
+                "category": "length",
+                "severity": "medium"
+            }
+        
+        # 4. Additional safety checks
+        # Check for potential spam patterns
+        if message.count(' ') < 2 and len(message) > 50:
+            return {
+                "blocked": True,
+                "reason": "Potential spam detected (too few spaces for length)",
+                "category": "spam",
+                "severity": "medium"
+            }
+        
+        # Check for excessive repetition
+        words = message_lower.split()
+        if len(words) > 10:
+            max_repetition = Counter(words).most_common(1)[0][1]
+            if max_repetition > len(words) * 0.3:  # More than 30% repetition
                 return {
                     "blocked": True,
-                    "reason": "Potential spam detected (too few spaces for length)",
+                    "reason": "Excessive word repetition detected",
                     "category": "spam",
                     "severity": "medium"
                 }
-            
-            # Check for excessive repetition
-            words = message_lower.split()
-            if len(words) > 10:
-                word_counts = {}
-                for word in words:
-                    word_counts[word] = word_counts.get(word, 0) + 1
-                
-                max_repetition = max(word_counts.values())
-                if max_repetition > len(words) * 0.3:  # More than 30% repetition
-                    return {
-                        "blocked": True,
-                        "reason": "Excessive word repetition detected",
-                        "category": "spam",
-                        "severity": "medium"
-                    }
-            
-            return {"blocked": False, "reason": None}
-            
-        except Exception as e:
-            logger.error(f"Error checking input guardrails: {e}")
-            return {"blocked": False, "reason": None}
+        
+        return {"blocked": False, "reason": None}
     
     async def check_output(self, response: str) -> Dict[str, Any]:
-        """Comprehensive output guardrails checking."""
+        """Comprehensive output guardrails checking, run off the event loop."""
+        return await run_in_threadpool(self._check_output_sync, response)
+    
+    def _check_output_sync(self, response: str) -> Dict[str, Any]:
+        """Run the CPU-bound output checks synchronously."""
         try:
-            response_lower = response.lower()
-            
-            # 1. Response Length Control - Limit answers to reasonable size
-            max_length = int(os.getenv("MAX_RESPONSE_LENGTH", "1000"))
-            if len(response) > max_length:
-                truncated_response = response[:max_length] + "..."
-                logger.warning(f"Response truncated to {max_length} characters")
-                return {
-                    "blocked": False,
-                    "reason": None,
-                    "truncated_response": truncated_response,
-                    "original_length": len(response)
-                }
+            # Cheap length-based checks run before any pattern scanning
+            # 1. Quality Check - Ensure response is meaningful
+            quality_check = self._check_quality(response)
+            if quality_check:
+                return quality_check
             
-            # 2. Citation Enforcement - Require citations when external facts are mentioned
-            citations_required = any(indicator in response_lower for indicator in self.citation_indicators)
+            # 2. Response Length Control - Limit answers to reasonable size.
+            # The remaining checks run on the text that will actually be sent.
+            result = {"blocked": False, "reason": None}
+            if len(response) > MAX_RESPONSE_LENGTH:
+                logger.warning("Response truncated to {} characters", MAX_RESPONSE_LENGTH)
+                result["truncated_response"] = response[:MAX_RESPONSE_LENGTH] + "..."
+                result["original_length"] = len(response)
+                response = response[:MAX_RESPONSE_LENGTH]
             
-            if citations_required:
-                # Check if citations are present
-                citation_present = any(word in response_lower for word in [
-                    "source:", "reference:", "citation:", "study:", "research:", 
-                    "according to", "as cited in", "from the study", "per the research"
-                ])
-                
-                if not citation_present:
-                    return {
-                        "blocked": True,
-                        "reason": "Citations required for factual claims",
-                        "category": "citation_required",
-                        "severity": "high",
-                        "citations": [],
-                        "suggested_response": "I need to provide more accurate information with proper citations. Let me research that for you."
-                    }
-            
-            # 3. Content Safety Check - Ensure response doesn't contain harmful content
-            for keyword in self.toxic_keywords:
-                if keyword in response_lower:
-                    return {
-                        "blocked": True,
-                        "reason": f"Response contains inappropriate content: '{keyword}'",
-                        "category": "content_safety",
-                        "severity": "high"
-                    }
+            response_lower = fold_case(response)
+            matches = self._scan(response_lower)
             
-            # 4. Topic Restriction Check - Ensure response doesn't discuss restricted topics
-            for topic in self.topic_restrictions:
-                if topic in response_lower:
-                    return {
-                        "blocked": True,
-                        "reason": f"Response discusses restricted topic: '{topic}'",
-                        "category": "topic_restriction",
-                        "severity": "high"
-                    }
+            # 3. Citation Enforcement - Require citations when external facts are mentioned
+            citation_check = self._check_citations(matches)
+            if citation_check:
+                return citation_check
             
-            # 5. Quality Check - Ensure response is meaningful
-            if len(response.strip()) < 10:
-                return {
-                    "blocked": True,
-                    "reason": "Response too short to be meaningful",
-                    "category": "quality",
-                    "severity": "low"
-                }
+            # 4-5. Content Safety and Topic Restriction Checks
+            content_check = self._check_content(response_lower, matches)
+            if content_check:
+                return content_check
             
             # 6. Check for potential hallucination indicators
-            hallucination_indicators = [
-                "i don't know", "i'm not sure", "i can't", "i cannot",
-                "i'm not able to", "i don't have access to"
-            ]
-            
-            if any(indicator in response_lower for indicator in hallucination_indicators):
+            if "hallucination_indicator" in matches:
                 logger.info("Response contains uncertainty indicators - may need verification")
             
-            return {"blocked": False, "reason": None}
+            return result
             
         except Exception as e:
-            logger.error(f"Error checking output guardrails: {e}")
+            logger.error("Error checking output guardrails: {}", e)
             return {"blocked": False, "reason": None}
+    
+    def _check_citations(self, matches: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Require a citation marker when a citation indicator was matched."""
+        citations_required = "citation_indicator" in matches
+        
+        if citations_required:
+            # Check if citations are present
+            citation_present = "citation_marker" in matches
+            
+            if not citation_present:
+                return {
+                    "blocked": True,
+                    "reason": "Citations required for factual claims",
+                    "category": "citation_required",
+                    "severity": "high",
+                    "citations": [],
+                    "suggested_response": "I need to provide more accurate information with proper citations. Let me research that for you."
+                }
+        return None
+    
+    def _check_content(self, response_lower: str, matches: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Block responses containing toxic keywords or restricted topics."""
+        # Content Safety Check - Ensure response doesn't contain harmful content
+        toxic_hits = self._toxic_keyword_hits(response_lower, matches)
+        if toxic_hits:
+            keyword = toxic_hits[0]
+            return {
+                "blocked": True,
+                "reason": f"Response contains inappropriate content: '{keyword}'",
+                "category": "content_safety",
+                "severity": "high"
+            }
+        
+        # Topic Restriction Check - Ensure response doesn't discuss restricted topics
+        if "topic_restriction" in matches:
+            topic = min(matches["topic_restriction"])[1]
+            return {
+                "blocked": True,
+                "reason": f"Response discusses restricted topic: '{topic}'",
+                "category": "topic_restriction",
+                "severity": "high"
+            }
+        return None
+    
+    @staticmethod
+    def _check_quality(response: str) -> Optional[Dict[str, Any]]:
+        """Block responses too short to be meaningful."""
+        if len(response.strip()) < 10:
+            return {
+                "blocked": True,
+                "reason": "Response too short to be meaningful",
+                "category": "quality",
+                "severity": "low"
+            }
+        return None
+
+
+class OutputStreamGuard:
+    """Incrementally applies output guardrails to a streamed response."""
+    
+    def __init__(self, manager: GuardrailsManager):
+        self.manager = manager
+        self.max_length = MAX_RESPONSE_LENGTH
+        self.buffer = ""
+        self.buffer_lower = ""
+        self.scanned = 0
+        self.truncated = False
+        self.matches: Dict[str, Any] = {}
+    
+    def feed(self, chunk: str) -> Tuple[str, Optional[Dict[str, Any]]]:
+        """Add a streamed chunk and return the newly cleared text and any block result.
+        
+        Text is only cleared up to the last space, so a word split across
+        chunks is never released before it has been checked.
+        """
+        room = self.max_length - len(self.buffer)
+        if len(chunk) > room:
+            chunk = chunk[:room]
+            self.truncated = True
+        self.buffer += chunk
+        self.buffer_lower += fold_case(chunk)
+        
+        end = self.buffer_lower.rfind(" ", self.scanned) + 1
+        if end <= self.scanned:
+            return "", None
+        return self._scan_until(end)
+    
+    def finish(self) -> Tuple[str, Optional[Dict[str, Any]]]:
+        """Check the remaining text and the whole-response guardrails."""
+        text, block = self._scan_until(len(self.buffer))
+        if block:
+            return text, block
+        if self.truncated:
+            logger.warning("Response truncated to {} characters", self.max_length)
+            text += "..."
+        
+        block = self.manager._check_citations(self.matches) or self.manager._check_quality(self.buffer)
+        if not block and "hallucination_indicator" in self.matches:
+            logger.info("Response contains uncertainty indicators - may need verification")
+        return text, block
+    
+    def _scan_until(self, end: int) -> Tuple[str, Optional[Dict[str, Any]]]:
+        """Scan buffer[scanned:end], overlapping the previous window for phrases."""
+        start = self.scanned
+        # Back up by the longest pattern so phrases spanning chunks are found
+        window_start = max(0, start - self.manager.max_pattern_length)
+        window_lower = self.buffer_lower[window_start:end]
+        matches = self.manager._scan(window_lower)
+        for category, found in matches.items():
+            self.matches.setdefault(category, []).extend(found)
+        
+        self.scanned = end
+        block = self.manager._check_content(self.buffer_lower[start:end], matches)
+        if block:
+            return "", block
+        return self.buffer[start:end], None
 
 
 class ChatGroqClient:
@@ -287,6 +637,17 @@ class ChatGroqClient:
         self.base_url = "https://api.chatgroq.com/v1"
         self.client = None
         
+        # Parts of the request body shared by every completion, built once
+        self._system_message = {
+            "role": "system",
+            "content": "You are a helpful, harmless, and honest AI assistant. Always be respectful and provide accurate information. If you make factual claims, include citations or sources."
+        }
+        self._payload_base = {
+            "model": "llama-3.1-70b-versatile",
+            "max_tokens": MAX_RESPONSE_LENGTH,
+            "temperature": 0.7
+        }
+        
     async def initialize(self):
         """Initialize the HTTP client."""
         if not self.api_key:
@@ -298,45 +659,73 @@ class ChatGroqClient:
                 "Authorization": f"Bearer {self.api_key}",
                 "Content-Type": "application/json"
             },
-            timeout=30.0
+            timeout=httpx.Timeout(30.0, connect=5.0),
+            # Limits and HTTP/2 are set on the transport; the client ignores
+            # them once a custom transport is supplied
+            transport=httpx.AsyncHTTPTransport(
+                http2=True,
+                limits=httpx.Limits(
+                    max_connections=200,
+                    max_keepalive_connections=50,
+                    keepalive_expiry=60.0
+                ),
+                retries=2
+            )
         )
         logger.info("ChatGroq client initialized")
     
-    async def generate_response(self, message: str, user_id: Optional[str] = None) -> str:
-        """Generate response using ChatGroq API."""
+    def _build_payload(self, message: str, stream: bool) -> bytes:
+        """Build the encoded chat completion request body."""
+        return orjson.dumps({
+            **self._payload_base,
+            "messages": [self._system_message, {"role": "user", "content": message}],
+            "stream": stream
+        })
+    
+    async def generate_response(self, message: str, user_id: Optional[str] = None) -> Tuple[bool, str]:
+        """Generate response using ChatGroq API.
+        
+        Returns ``(True, content)`` on success and ``(False, error)`` when the
+        API call fails, so callers can branch without catching exceptions.
+        """
         try:
             if not self.client:
                 await self.initialize()
             
-            payload = {
-                "messages": [
-                    {
-                        "role": "system",
-                        "content": "You are a helpful, harmless, and honest AI assistant. Always be respectful and provide accurate information. If you make factual claims, include citations or sources."
-                    },
-                    {
-                        "role": "user",
-                        "content": message
-                    }
-                ],
-                "model": "llama-3.1-70b-versatile",
-                "max_tokens": int(os.getenv("MAX_RESPONSE_LENGTH", "1000")),
-                "temperature": 0.7,
-                "stream": False
-            }
+            payload = self._build_payload(message, stream=False)
             
-            response = await self.client.post("/chat/completions", json=payload)
+            response = await self.client.post("/chat/completions", content=payload)
             response.raise_for_status()
             
             data = response.json()
-            return data["choices"][0]["message"]["content"]
+            return True, data["choices"][0]["message"]["content"]
             
         except httpx.HTTPStatusError as e:
-            logger.error(f"ChatGroq API error: {e.response.status_code} - {e.response.text}")
-            raise HTTPException(status_code=e.response.status_code, detail="ChatGroq API error")
+            logger.error("ChatGroq API error: {} - {}", e.response.status_code, e.response.text)
+            return False, "ChatGroq API error"
         except Exception as e:
-            logger.error(f"Error generating response: {e}")
-            raise HTTPException(status_code=500, detail="Internal server error")
+            logger.error("Error generating response: {}", e)
+            return False, "Internal server error"
+    
+    async def stream_response(self, message: str, user_id: Optional[str] = None) -> AsyncIterator[str]:
+        """Stream response content from ChatGroq API as it is generated."""
+        if not self.client:
+            await self.initialize()
+        
+        payload = self._build_payload(message, stream=True)
+        
+        async with self.client.stream("POST", "/chat/completions", content=payload) as response:
+            response.raise_for_status()
+            async for line in response.aiter_lines():
+                if not line.startswith("data:"):
+                    continue
+                data = line[len("data:"):].strip()
+                if data == "[DONE]":
+                    break
+                
+                delta = orjson.loads(data)["choices"][0].get("delta", {}).get("content")
+                if delta:
+                    yield delta
     
     async def close(self):
         """Close the HTTP client."""
@@ -385,17 +774,19 @@ app = FastAPI(
     lifespan=lifespan
 )
 
-# Add CORS middleware
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+# Add CORS middleware for the configured origins only; same-origin
+# deployments leave CORS_ORIGINS unset and skip the middleware entirely
+if CORS_ORIGINS:
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=CORS_ORIGINS,
+        allow_credentials=True,
+        allow_methods=["GET", "POST"],
+        allow_headers=["authorization", "content-type"],
+    )
 
 
-@app.get("/")
+@app.get("/", response_class=OrjsonResponse)
 async def root():
     """Root endpoint with API information."""
     return {
@@ -404,13 +795,14 @@ async def root():
         "status": "running",
         "endpoints": {
             "chat": "/chat",
+            "chat_stream": "/chat/stream",
             "health": "/health",
             "docs": "/docs"
         }
     }
 
 
-@app.get("/health")
+@app.get("/health", response_class=OrjsonResponse)
 async def health_check():
     """Health check endpoint."""
     return {
@@ -420,7 +812,7 @@ async def health_check():
     }
 
 
-@app.post("/chat", response_model=ChatResponse)
+@app.post("/chat", response_model=ChatResponse, response_model_exclude_none=True)
 async def chat(request: ChatRequest):
     """
     Main chat endpoint with guardrails protection.
@@ -433,12 +825,28 @@ async def chat(request: ChatRequest):
     5. Output validation and citation enforcement
     """
     try:
-        logger.info(f"Processing chat request from user: {request.user_id}")
+        logger.info("Processing chat request from user: {}", request.user_id)
+        
+        # Speculatively start generation; it is cancelled if the input is blocked
+        generation = None
+        if GUARDRAIL_PARALLEL:
+            generation = asyncio.create_task(
+                chatgroq_client.generate_response(request.message, request.user_id)
+            )
         
         # Step 1: Check input against guardrails
-        input_check = await guardrails_manager.check_input(request.message, request.user_id)
+        try:
+            input_check = await guardrails_manager.check_input(request.message, request.user_id)
+        except BaseException:
+            if generation:
+                generation.cancel()
+            raise
         if input_check["blocked"]:
-            logger.warning(f"Input blocked: {input_check['reason']}")
+            logger.warning("Input blocked: {}", input_check["reason"])
+            if generation:
+                generation.cancel()
+                with suppress(asyncio.CancelledError):
+                    await generation
             return ChatResponse(
                 response="I'm sorry, but I can't help with that request. Please try asking something else.",
                 blocked=True,
@@ -447,21 +855,23 @@ async def chat(request: ChatRequest):
             )
         
         # Step 2: Generate AI response
-        try:
-            ai_response = await chatgroq_client.generate_response(request.message, request.user_id)
-        except HTTPException as e:
-            logger.error(f"ChatGroq API error: {e.detail}")
+        if generation:
+            ok, ai_response = await generation
+        else:
+            ok, ai_response = await chatgroq_client.generate_response(request.message, request.user_id)
+        if not ok:
+            logger.error("ChatGroq API error: {}", ai_response)
             return ChatResponse(
                 response="I'm experiencing technical difficulties. Please try again later.",
                 blocked=False,
                 reason="API error",
-                metadata={"error": str(e.detail)}
+                metadata={"error": ai_response}
             )
         
         # Step 3: Check output against guardrails
         output_check = await guardrails_manager.check_output(ai_response)
         if output_check["blocked"]:
-            logger.warning(f"Output blocked: {output_check['reason']}")
+            logger.warning("Output blocked: {}", output_check["reason"])
             return ChatResponse(
                 response=output_check.get("suggested_response", "I need to provide more accurate information with proper citations. Let me research that for you."),
                 blocked=True,
@@ -478,7 +888,7 @@ async def chat(request: ChatRequest):
         # Handle truncated response
         if "truncated_response" in output_check:
             ai_response = output_check["truncated_response"]
-            logger.info(f"Response truncated from {output_check['original_length']} to {len(ai_response)} characters")
+            logger.info("Response truncated from {} to {} characters", output_check["original_length"], len(ai_response))
         
         # Step 4: Return successful response
         logger.info("Chat request processed successfully")
@@ -493,11 +903,82 @@ async def chat(request: ChatRequest):
         )
         
     except Exception as e:
-        logger.error(f"Unexpected error in chat endpoint: {e}")
+        logger.error("Unexpected error in chat endpoint: {}", e)
         raise HTTPException(status_code=500, detail="Internal server error")
 
 
-@app.get("/guardrails/status")
+def format_sse(event: str, data: Dict[str, Any]) -> str:
+    """Format a server-sent event."""
+    return f"event: {event}\ndata: {orjson.dumps(data).decode()}\n\n"
+
+
+@app.post("/chat/stream")
+async def chat_stream(request: ChatRequest):
+    """
+    Streaming chat endpoint with guardrails protection.
+    
+    Emits server-sent events: ``message`` events carry response text as it
+    clears the output guardrails, ``blocked`` replaces the response when a
+    guardrail trips, ``error`` reports API failures and ``done`` ends the stream.
+    """
+    logger.info("Processing streaming chat request from user: {}", request.user_id)
+    
+    input_check = await guardrails_manager.check_input(request.message, request.user_id)
+    
+    async def events() -> AsyncIterator[str]:
+        if input_check["blocked"]:
+            logger.warning("Input blocked: {}", input_check["reason"])
+            yield format_sse("blocked", {
+                "response": "I'm sorry, but I can't help with that request. Please try asking something else.",
+                "reason": input_check["reason"],
+                "category": input_check.get("category")
+            })
+            return
+        
+        guard = OutputStreamGuard(guardrails_manager)
+        stream = chatgroq_client.stream_response(request.message, request.user_id)
+        block = None
+        try:
+            async for chunk in stream:
+                text, block = guard.feed(chunk)
+                if text:
+                    yield format_sse("message", {"content": text})
+                if block or guard.truncated:
+                    break
+            
+            if not block:
+                text, block = guard.finish()
+                if text:
+                    yield format_sse("message", {"content": text})
+        except httpx.HTTPStatusError as e:
+            logger.error("ChatGroq API error: {}", e.response.status_code)
+            yield format_sse("error", {"response": "I'm experiencing technical difficulties. Please try again later.", "reason": "API error"})
+            return
+        except Exception as e:
+            logger.error("Unexpected error in chat stream: {}", e)
+            yield format_sse("error", {"response": "I'm experiencing technical difficulties. Please try again later.", "reason": "Internal server error"})
+            return
+        finally:
+            # Closes the upstream response if we stopped reading early
+            await stream.aclose()
+        
+        if block:
+            logger.warning("Output blocked: {}", block["reason"])
+            yield format_sse("blocked", {
+                "response": block.get("suggested_response", "I need to provide more accurate information with proper citations. Let me research that for you."),
+                "reason": block["reason"],
+                "category": block.get("category"),
+                "severity": block.get("severity")
+            })
+            return
+        
+        logger.info("Streaming chat request processed successfully")
+        yield format_sse("done", {"response_length": len(guard.buffer)})
+    
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+
+@app.get("/guardrails/status", response_class=OrjsonResponse)
 async def guardrails_status():
     """Get current guardrails status and comprehensive configuration."""
     return {
@@ -505,23 +986,23 @@ async def guardrails_status():
         "implementation": "NeMo Guardrails + Custom Guardrails" if guardrails_manager.app else "Custom Guardrails",
         "features": {
             "topic_restrictions": {
-                "enabled": os.getenv("ENABLE_TOPIC_RESTRICTIONS", "True").lower() == "true",
+                "enabled": ENABLE_TOPIC_RESTRICTIONS,
                 "restricted_topics": len(guardrails_manager.topic_restrictions),
                 "examples": guardrails_manager.topic_restrictions[:5]  # Show first 5 examples
             },
             "toxicity_filter": {
-                "enabled": os.getenv("ENABLE_TOXICITY_FILTER", "True").lower() == "true",
+                "enabled": ENABLE_TOXICITY_FILTER,
                 "toxic_keywords": len(guardrails_manager.toxic_keywords),
                 "examples": guardrails_manager.toxic_keywords[:5]  # Show first 5 examples
             },
             "citation_enforcement": {
-                "enabled": os.getenv("ENABLE_CITATION_ENFORCEMENT", "True").lower() == "true",
+                "enabled": ENABLE_CITATION_ENFORCEMENT,
                 "citation_indicators": len(guardrails_manager.citation_indicators),
                 "examples": guardrails_manager.citation_indicators[:3]  # Show first 3 examples
             },
             "response_length_control": {
-                "max_response_length": int(os.getenv("MAX_RESPONSE_LENGTH", "1000")),
-                "max_input_length": int(os.getenv("MAX_INPUT_LENGTH", "1500"))
+                "max_response_length": MAX_RESPONSE_LENGTH,
+                "max_input_length": MAX_INPUT_LENGTH
             },
             "additional_safety": {
                 "spam_detection": True,
@@ -530,6 +1011,7 @@ async def guardrails_status():
                 "hallucination_detection": True
             }
         },
+        "input_check_cache": guardrails_manager.input_cache_info(),
         "api_integration": {
             "chatgroq": chatgroq_client.client is not None,
             "model": "llama-3.1-70b-versatile"
@@ -549,5 +1031,7 @@ if __name__ == "__main__":
         host=host,
         port=port,
         reload=debug,
-        log_level="info"
+        log_level="info",
+        # The reloader runs a single process and ignores workers
+        workers=None if debug else int(os.getenv("WEB_CONCURRENCY", "1"))
     )
@@ -2,7 +2,6 @@
 
 import os
 import sys
-import subprocess
 from pathlib import Path
 
 
@@ -49,13 +48,19 @@ def start_server():
     print("\n" + "="*50)
     
     try:
-        subprocess.run([
-            sys.executable, "-m", "uvicorn", 
-            "main:app", 
-            "--host", host, 
-            "--port", str(port), 
-            "--reload" if debug else "--no-reload"
-        ])
+        import uvicorn
+        
+        # Run in-process rather than spawning a second interpreter; uvicorn[standard]
+        # picks uvloop and httptools automatically where they are available
+        uvicorn.run(
+            "main:app",
+            host=host,
+            port=port,
+            reload=debug,
+            log_level="info",
+            # The reloader runs a single process and ignores workers
+            workers=None if debug else int(os.getenv("WEB_CONCURRENCY", "1"))
+        )
     except KeyboardInterrupt:
         print("\n👋 Server stopped by user")
     except Exception as e:
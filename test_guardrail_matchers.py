@@ -0,0 +1,132 @@
+import os
+import random
+import tempfile
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+import pytest
+
+# main configures its log sinks at import; keep test runs out of the working tree
+os.environ.setdefault("LOG_FILE", os.path.join(tempfile.mkdtemp(), "app.log"))
+os.environ.setdefault("LOG_TO_STDOUT", "False")
+
+import main  # noqa: E402
+
+
+# Fragments random texts are assembled from: every guardrail pattern, pieces
+# of patterns, separators and non-ASCII text (byte backends report byte offsets)
+_EXTRA_FRAGMENTS = [" ", " ", "'", ".", "a", "e", "s", "hel", "acc", "ord", "stu", "é", "ß", "日本", "🙂"]
+
+# Messages the toxic keyword filter must block, with the keyword it reports
+_TOXIC_CASES = [
+    ("You are stupid", "stupid"),
+    ("You idiots", "idiot"),
+    ("this sucks", "suck"),
+    ("you are 'stupid'", "stupid"),
+    ("fucking hell", "fuck"),
+    ("bullshit", "shit"),
+    ("bullshitting", "shit"),
+    ("motherfucker", "fuck"),
+]
+
+# Messages containing a milder keyword only in the middle of a longer word
+_CLEAN_CASES = [
+    "I studied hard",
+    "great skills",
+    "scrappy code",
+]
+
+_STREAM_CASES = [
+    "This answer is awful and long enough to pass the quality check.",
+    "Let us talk about the election process in detail.",
+    "Research shows coffee is great for many people overall.",
+    "Research shows coffee is great. Source: a study by people.",
+    "I don't know, but here is a fine answer for you.",
+    "A perfectly fine answer that is long enough.",
+    "Short",
+    # Longer than MAX_RESPONSE_LENGTH: checked after truncation
+    "You are an idiot. Let us discuss the election. " + "word " * 240,
+]
+
+
+def _manager(monkeypatch, backend: str) -> main.GuardrailsManager:
+    """Build a GuardrailsManager whose automata use the given matcher backend."""
+    if backend == "pyahocorasick" and main.ahocorasick is None:
+        pytest.skip("pyahocorasick is not installed")
+    if backend == "numba" and not main._load_jit():
+        pytest.skip("numba is not installed")
+    if backend != "pyahocorasick":
+        monkeypatch.setattr(main, "ahocorasick", None)
+    if backend == "bytes":
+        monkeypatch.setattr(main, "_load_jit", lambda: False)
+    return main.GuardrailsManager()
+
+
+def _scan_sets(manager: main.GuardrailsManager, text: str, automaton: Optional[Any] = None) -> Dict[str, Set[Tuple[int, str]]]:
+    """Scan results as sets, since BytePatternSet reports first occurrences only."""
+    return {category: set(found) for category, found in manager._scan(text, automaton).items()}
+
+
+@pytest.mark.parametrize("backend", ["pyahocorasick", "numba"])
+def test_scan_matches_reference_backend(monkeypatch, backend):
+    reference = _manager(monkeypatch, "bytes")
+    assert isinstance(reference.automaton, main.BytePatternSet)
+    monkeypatch.undo()
+    manager = _manager(monkeypatch, backend)
+
+    fragments = (
+        manager.topic_restrictions + manager.toxic_phrases + manager.citation_indicators
+        + manager.citation_markers + manager.hallucination_indicators
+        + [phrase for phrases in manager.keyword_exceptions.values() for phrase in phrases]
+        + _EXTRA_FRAGMENTS
+    )
+    rng = random.Random(0)
+    for _ in range(1000):
+        text = main.fold_case("".join(rng.choice(fragments) for _ in range(rng.randint(0, 12))))
+        assert _scan_sets(manager, text) == _scan_sets(reference, text), text
+        assert _scan_sets(manager, text, manager._allow_automaton) == _scan_sets(reference, text, reference._allow_automaton), text
+
+
+@pytest.mark.parametrize("backend", ["pyahocorasick", "numba", "bytes"])
+def test_toxic_keyword_word_boundaries(monkeypatch, backend):
+    manager = _manager(monkeypatch, backend)
+    for message, keyword in _TOXIC_CASES:
+        message_lower = main.fold_case(message)
+        assert manager._check_input_sync(message)["reason"] == f"Toxicity detected: '{keyword}' found", message
+        assert manager._check_content(message_lower, manager._scan(message_lower))["category"] == "content_safety", message
+    for message in _CLEAN_CASES:
+        message_lower = main.fold_case(message)
+        assert not manager._check_input_sync(message)["blocked"], message
+        assert manager._toxic_keyword_hits(message_lower, manager._scan(message_lower)) == [], message
+
+
+def _stream(manager: main.GuardrailsManager, chunks: List[str]) -> Tuple[str, Optional[Dict[str, Any]]]:
+    """Feed chunks through an OutputStreamGuard, returning released text and any block."""
+    guard = main.OutputStreamGuard(manager)
+    released = []
+    for chunk in chunks:
+        text, block = guard.feed(chunk)
+        released.append(text)
+        if block:
+            return "".join(released), block
+    text, block = guard.finish()
+    released.append(text)
+    return "".join(released), block
+
+
+@pytest.mark.parametrize("response", _STREAM_CASES)
+def test_stream_guard_handles_patterns_split_across_chunks(response):
+    manager = main.GuardrailsManager()
+    expected = manager._check_output_sync(response)
+    expected_category = expected.get("category") if expected["blocked"] else None
+
+    splits = [[response[:i], response[i:]] for i in range(1, len(response))]
+    rng = random.Random(response)
+    for _ in range(50):
+        cuts = sorted(rng.sample(range(1, len(response)), min(len(response) - 1, rng.randint(2, 8))))
+        splits.append([response[i:j] for i, j in zip([0] + cuts, cuts + [len(response)])])
+
+    for chunks in splits:
+        released, block = _stream(manager, chunks)
+        assert (block.get("category") if block else None) == expected_category, chunks
+        if not block:
+            assert released == response, chunks